@@ -1,56 +1,230 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import sys
 import time
 import json
+import math
+import re
 import socket
-import statistics
 import subprocess
 import platform
+import shutil
 import csv
 import argparse
+import ipaddress
+import functools
+import threading
 import random
 import string
+import struct
 from datetime import datetime
+from types import MappingProxyType
 from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses the raw bytes from a subprocess without decoding them first
+# and serializes straight to bytes
+if orjson is not None:
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+else:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj):
+        return json.dumps(obj, indent=2).encode()
+
+def _json_fragment(obj, depth):
+    """Serialize obj for splicing into an indented JSON document at the given depth"""
+    return _json_dumps(obj).replace(b"\n", b"\n" + b"  " * depth)
+
+# Shared read-only default for lookups of optional nested sections
+_EMPTY = MappingProxyType({})
+
+# Below this many samples numpy's import cost outweighs its faster reductions
+_NUMPY_MIN_SAMPLES = 1000
+
+@functools.lru_cache(maxsize=1)
+def _load_numpy():
+    """Import numpy on first use; returns None when it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+@functools.lru_cache(maxsize=1)
+def _load_summary_kernel():
+    """Compile the numba summary kernel on first use; returns None without numba"""
+    try:
+        import numba
+    except ImportError:
+        return None
+    
+    @numba.njit(nogil=True)
+    def summarize(column):
+        # Fused mean/min/max/M2 pass (Welford) over a non-empty float64 array
+        n = column.shape[0]
+        mean = 0.0
+        m2 = 0.0
+        low = column[0]
+        high = column[0]
+        for i in range(n):
+            x = column[i]
+            if x < low:
+                low = x
+            if x > high:
+                high = x
+            delta = x - mean
+            mean += delta / (i + 1)
+            m2 += delta * (x - mean)
+        return mean, low, high, (m2 / (n - 1)) ** 0.5 if n > 1 else 0.0
+    
+    return summarize
+
+# Give up on a local file transfer that makes no progress for this long
+_TRANSFER_TIMEOUT_S = 300
+
+# Probe spacing shared by every RTT source (fping, icmplib, ping) so jitter
+# is comparable between machines; 1 s is the system ping default. It is
+# also the per-probe timeout, so slow replies are not counted as lost.
+_PING_INTERVAL_MS = 1000
+
+# Parsers for command output, compiled once at import
+_PING_TIME_RE = re.compile(rb"time[=<]([\d.]+)")
+_PING_LOSS_RE = re.compile(rb"([\d.]+%) packet loss")
+_IPERF_SENDER_RE = re.compile(r"([\d.]+) Mbits/sec.*\bsender\b")
+_SPEEDTEST_TEXT_RE = re.compile(r"(Download|Upload|Ping):\s*([\d.]+)")
+_ETHTOOL_RE = re.compile(r"^\s*(Speed|Duplex|Link detected):\s*(.*?)\s*$", re.M)
+_IWCONFIG_RE = re.compile(
+    r"ESSID:(?P<essid>.*)|Frequency:(?P<frequency>\S+)|Bit Rate=(?P<bit_rate>\S+)|Signal level=(?P<signal>\S+)"
+)
+_AIRPORT_RE = re.compile(r"^\s*(SSID|channel|agrCtlRSSI|lastTxRate):\s*(.*?)\s*$", re.M)
+
+class RunningStats:
+    """Single-pass count/mean/min/max/stdev accumulator (Welford's algorithm)"""
+    __slots__ = ("count", "mean", "m2", "min", "max")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+    
+    def update(self, value):
+        """Add one value to the running statistics"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+    
+    @property
+    def stdev(self):
+        """Sample standard deviation, or 0 with fewer than two values"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0
+
+
 class NetworkPerformanceTester:
     def __init__(self, output_file=None, iterations=3, iperf_server=None, 
-                 speedtest=True, local_test=True, duration=10):
+                 speedtest=True, local_test=True, duration=10, streams=1, window=None,
+                 concurrent=False, ping_count=100, bidir=False):
         self.iterations = iterations
         self.output_file = output_file
         self.iperf_server = iperf_server
+        self.streams = streams
+        self.window = window
+        self.concurrent = concurrent
+        self.ping_count = ping_count
+        self.bidir = bidir
         self.should_run_speedtest = speedtest
         self.run_local_test = local_test
         self.duration = duration
         
         self.system_info = self._get_system_info()
-        self.results = []
+        # Each iteration's full results, kept as serialized JSON until the
+        # raw results file is written
+        self._result_blobs = []
+        
+        # CSV layout depends only on which tests are enabled, so build it once
+        self._schema = self._build_csv_schema()
+        self._fieldnames = [column for column, _, _ in self._schema]
         
-        # Check for required tools
+        # Column-oriented copy of the metrics the summary aggregates; the
+        # other CSV fields only go into the streamed rows
+        self._summary_metrics = self._build_summary_metrics()
+        self._columns = {column: [] for column in self._summary_metrics.values()}
+        
+        # The CSV fields grouped by result section, so each section is looked
+        # up once per iteration rather than once per column
+        self._section_columns = {}
+        for index, (column, section, key) in enumerate(self._schema):
+            self._section_columns.setdefault(section, []).append((index, self._columns.get(column), key))
+        
+        # CSV rows are streamed to disk as iterations finish (see _open_csv)
+        self._csv_fd = None
+        self._csv_saved = False
+        
+        # Resolve the iperf3 server once instead of in every iperf3 run
+        self.iperf_server_ip = self._resolve_host(iperf_server) if iperf_server else None
+        
+        # Check for required tools (PATH lookups only, nothing is executed)
         self.has_iperf3 = self._check_tool("iperf3")
-        self.has_speedtest = self._check_tool("speedtest-cli") or self._check_tool("speedtest")
+        self.has_fping = self._check_tool("fping")
+        if self._check_tool("speedtest-cli"):
+            self.speedtest_cmd = ["speedtest-cli", "--json"]
+        elif self._check_tool("speedtest"):
+            self.speedtest_cmd = ["speedtest", "--format=json"]
+        else:
+            self.speedtest_cmd = None
+        self.has_speedtest = self.speedtest_cmd is not None
         
         if not self.has_iperf3:
             print("Warning: iperf3 not found. Some tests will be skipped.")
             print("Install with: 'apt install iperf3' (Linux) or 'brew install iperf3' (macOS)")
         
-        if not self.has_speedtest and self.run_speedtest:
+        if not self.has_speedtest and self.should_run_speedtest:
             print("Warning: speedtest-cli not found. Internet speed tests will be skipped.")
             print("Install with: 'pip install speedtest-cli'")
     
     def _check_tool(self, tool):
-        """Check if a command-line tool is available"""
+        """Check if a command-line tool is available on the PATH"""
+        return shutil.which(tool) is not None
+    
+    def _resolve_host(self, host):
+        """Resolve a host name to an IP address, returning IP addresses unchanged"""
         try:
-            subprocess.check_call(
-                [tool, "--version"], 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL
-            )
-            return True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            return False
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+        
+        try:
+            return socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][4][0]
+        except socket.gaierror as e:
+            print(f"Warning: could not resolve {host}: {e}")
+            return host
     
     def _get_system_info(self):
         """Gather system and network interface information"""
@@ -63,14 +237,19 @@ class NetworkPerformanceTester:
         }
         return info
     
-    def _get_network_interfaces(self):
-        """Get network interface information based on OS"""
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_network_interfaces():
+        """Get network interface information based on OS (cached per process)"""
+        if psutil is not None:
+            return NetworkPerformanceTester._get_network_interfaces_psutil()
+        
         interfaces = {}
         
         if platform.system() == "Linux":
             try:
                 # Use ip command for Linux
-                output = subprocess.check_output("ip -o addr show", shell=True, text=True)
+                output = subprocess.run(["ip", "-o", "addr", "show"], capture_output=True, text=True, check=True).stdout
                 for line in output.strip().split('\n'):
                     parts = line.split()
                     if len(parts) >= 4 and parts[2] == "inet":
@@ -78,7 +257,7 @@ class NetworkPerformanceTester:
                         ip = parts[3].split('/')[0]
                         interfaces[iface] = {
                             "ip": ip,
-                            "details": self._get_interface_details_linux(iface)
+                            "details": NetworkPerformanceTester._get_interface_details_linux(iface)
                         }
             except Exception as e:
                 print(f"Error getting network interfaces: {e}")
@@ -86,7 +265,7 @@ class NetworkPerformanceTester:
         elif platform.system() == "Darwin":  # macOS
             try:
                 # Use ifconfig for macOS
-                output = subprocess.check_output("ifconfig", shell=True, text=True)
+                output = subprocess.run(["ifconfig"], capture_output=True, text=True, check=True).stdout
                 current_iface = None
                 for line in output.strip().split('\n'):
                     if not line.startswith('\t'):
@@ -97,55 +276,133 @@ class NetworkPerformanceTester:
                         ip = line.strip().split()[1]
                         interfaces[current_iface] = {
                             "ip": ip,
-                            "details": self._get_interface_details_macos(current_iface)
+                            "details": NetworkPerformanceTester._get_interface_details_macos(current_iface)
                         }
             except Exception as e:
                 print(f"Error getting network interfaces: {e}")
         
         return interfaces
     
-    def _get_interface_details_linux(self, iface):
+    @staticmethod
+    def _get_network_interfaces_psutil():
+        """Get network interface information in-process using psutil"""
+        interfaces = {}
+        
+        try:
+            stats = psutil.net_if_stats()
+            wireless = NetworkPerformanceTester._read_proc_net_wireless()
+            for iface, addrs in psutil.net_if_addrs().items():
+                for addr in addrs:
+                    if addr.family == socket.AF_INET:
+                        interfaces[iface] = {
+                            "ip": addr.address,
+                            "details": NetworkPerformanceTester._get_interface_details_psutil(
+                                iface, stats.get(iface), wireless
+                            )
+                        }
+                        break
+        except Exception as e:
+            print(f"Error getting network interfaces: {e}")
+        
+        return interfaces
+    
+    @staticmethod
+    def _read_proc_net_wireless():
+        """Map wireless interface names to signal level from /proc/net/wireless (Linux)"""
+        wireless = {}
+        try:
+            with open("/proc/net/wireless") as f:
+                # Skip the two header lines
+                for line in f.readlines()[2:]:
+                    iface, _, fields = line.partition(":")
+                    fields = fields.split()
+                    if len(fields) >= 3:
+                        wireless[iface.strip()] = fields[2].rstrip(".") + " dBm"
+        except OSError:
+            pass
+        return wireless
+    
+    @staticmethod
+    def _get_interface_details_psutil(iface, stats, wireless):
+        """Get detailed info about a network interface from psutil stats"""
+        details = {}
+        
+        if stats is not None:
+            details["speed"] = f"{stats.speed}Mb/s" if stats.speed else "Unknown"
+            details["duplex"] = {
+                psutil.NIC_DUPLEX_FULL: "Full",
+                psutil.NIC_DUPLEX_HALF: "Half"
+            }.get(stats.duplex, "Unknown")
+            details["link"] = "yes" if stats.isup else "no"
+        else:
+            details["speed"] = "Unknown"
+            details["link"] = "Unknown"
+        
+        if platform.system() == "Linux":
+            if iface in wireless:
+                details["type"] = "wireless"
+                details["signal"] = wireless[iface]
+                # The SSID is not exposed through /proc, so ask iwconfig for
+                # wireless interfaces only
+                iw_details = NetworkPerformanceTester._get_wireless_details_linux(iface)
+                details.update({k: v for k, v in iw_details.items() if k != "type"})
+            else:
+                details["type"] = "wired"
+        elif platform.system() == "Darwin":
+            if iface.startswith('en'):
+                details.update(NetworkPerformanceTester._get_wireless_details_macos())
+            else:
+                details["type"] = "other"
+        
+        return details
+    
+    def invalidate_interface_cache(self):
+        """Discard cached interface information and re-read it"""
+        NetworkPerformanceTester._get_network_interfaces.cache_clear()
+        self.system_info["interfaces"] = self._get_network_interfaces()
+    
+    @staticmethod
+    def _get_interface_details_linux(iface):
         """Get detailed info about a network interface on Linux"""
         details = {}
         
         # Get link speed and status
         try:
-            output = subprocess.check_output(f"ethtool {iface} 2>/dev/null || echo 'Speed: Unknown'", 
-                                            shell=True, text=True)
-            for line in output.strip().split('\n'):
-                line = line.strip()
-                if "Speed:" in line:
-                    details["speed"] = line.split("Speed:")[1].strip()
-                elif "Link detected:" in line:
-                    details["link"] = line.split("Link detected:")[1].strip()
-                elif "Duplex:" in line:
-                    details["duplex"] = line.split("Duplex:")[1].strip()
+            try:
+                output = subprocess.run(["ethtool", iface], capture_output=True, text=True, check=True).stdout
+            except (subprocess.SubprocessError, OSError):
+                output = "Speed: Unknown"
+            keys = {"Speed": "speed", "Duplex": "duplex", "Link detected": "link"}
+            for name, value in _ETHTOOL_RE.findall(output):
+                details[keys[name]] = value
         except Exception:
             details["speed"] = "Unknown"
             details["link"] = "Unknown"
             
         # Check if wireless
+        details.update(NetworkPerformanceTester._get_wireless_details_linux(iface))
+        
+        return details
+    
+    @staticmethod
+    def _get_wireless_details_linux(iface):
+        """Get wireless details for an interface on Linux using iwconfig"""
+        details = {}
+        
         try:
-            output = subprocess.check_output(f"iwconfig {iface} 2>/dev/null || echo ''", 
-                                           shell=True, text=True)
-            if "ESSID:" in output:
+            try:
+                output = subprocess.run(["iwconfig", iface], capture_output=True, text=True, check=True).stdout
+            except (subprocess.SubprocessError, OSError):
+                output = ""
+            # One scan picks up ESSID, frequency, bit rate and signal level
+            fields = {}
+            for match in _IWCONFIG_RE.finditer(output):
+                fields.setdefault(match.lastgroup, match.group(match.lastgroup))
+            
+            if "essid" in fields:
                 details["type"] = "wireless"
-                # Extract ESSID
-                if "ESSID:" in output:
-                    essid_part = output.split("ESSID:")[1].split("\n")[0]
-                    details["essid"] = essid_part.strip().strip('"')
-                # Extract frequency
-                if "Frequency:" in output:
-                    freq_part = output.split("Frequency:")[1].split(" ")[0]
-                    details["frequency"] = freq_part.strip()
-                # Extract bit rate
-                if "Bit Rate=" in output:
-                    rate_part = output.split("Bit Rate=")[1].split(" ")[0]
-                    details["bit_rate"] = rate_part.strip()
-                # Extract signal level
-                if "Signal level=" in output:
-                    signal_part = output.split("Signal level=")[1].split(" ")[0]
-                    details["signal"] = signal_part.strip()
+                details["essid"] = fields.pop("essid").strip().strip('"')
+                details.update(fields)
             else:
                 details["type"] = "wired"
         except Exception:
@@ -153,7 +410,8 @@ class NetworkPerformanceTester:
         
         return details
     
-    def _get_interface_details_macos(self, iface):
+    @staticmethod
+    def _get_interface_details_macos(iface):
         """Get detailed info about a network interface on macOS"""
         details = {}
         
@@ -161,33 +419,16 @@ class NetworkPerformanceTester:
         try:
             # Only check wireless details if the interface starts with 'en'
             if iface.startswith('en'):
-                output = subprocess.check_output(
-                    f"/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -I 2>/dev/null || echo ''", 
-                    shell=True, text=True
-                )
-                
-                if "SSID:" in output:
-                    details["type"] = "wireless"
-                    # Extract SSID
-                    for line in output.strip().split('\n'):
-                        line = line.strip()
-                        if "SSID:" in line:
-                            details["essid"] = line.split("SSID:")[1].strip()
-                        elif "channel:" in line:
-                            details["channel"] = line.split("channel:")[1].strip()
-                        elif "agrCtlRSSI:" in line:
-                            details["signal"] = line.split("agrCtlRSSI:")[1].strip() + " dBm"
-                        elif "lastTxRate:" in line:
-                            details["bit_rate"] = line.split("lastTxRate:")[1].strip() + " Mbps"
-                else:
-                    details["type"] = "wired"
+                details.update(NetworkPerformanceTester._get_wireless_details_macos())
                     
                 # For both wired and wireless, try to get link speed
                 try:
-                    linkspeed_output = subprocess.check_output(
-                        f"networksetup -getmedia {iface} 2>/dev/null || echo 'Device not found'", 
-                        shell=True, text=True
-                    )
+                    try:
+                        linkspeed_output = subprocess.run(
+                            ["networksetup", "-getmedia", iface], capture_output=True, text=True, check=True
+                        ).stdout
+                    except (subprocess.SubprocessError, OSError):
+                        linkspeed_output = "Device not found"
                     if "active =" in linkspeed_output:
                         for line in linkspeed_output.strip().split('\n'):
                             if "media active:" in line.lower() and "baseT" in line:
@@ -203,54 +444,61 @@ class NetworkPerformanceTester:
             
         return details
     
+    @staticmethod
+    def _get_wireless_details_macos():
+        """Get details of the active Wi-Fi connection on macOS using airport"""
+        details = {}
+        
+        try:
+            output = subprocess.run(
+                ["/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport", "-I"],
+                capture_output=True, text=True, check=True
+            ).stdout
+        except (subprocess.SubprocessError, OSError):
+            output = ""
+        
+        fields = dict(_AIRPORT_RE.findall(output))
+        if "SSID" in fields:
+            details["type"] = "wireless"
+            details["essid"] = fields["SSID"]
+            if "channel" in fields:
+                details["channel"] = fields["channel"]
+            if "agrCtlRSSI" in fields:
+                details["signal"] = fields["agrCtlRSSI"] + " dBm"
+            if "lastTxRate" in fields:
+                details["bit_rate"] = fields["lastTxRate"] + " Mbps"
+        else:
+            details["type"] = "wired"
+        
+        return details
+    
     def run_latency_jitter_test(self, host="8.8.8.8", count=100):
         """Run a ping test to measure latency and jitter"""
         print(f"Running latency and jitter test to {host} ({count} pings)...")
         
-        ping_param = "-c" if platform.system() != "Windows" else "-n"
+        # Filled in by the RTT source once it knows the loss figure
+        summary = {"packet_loss": "100%"}
+        
+        if self.has_fping:
+            rtts = self._fping_rtts(host, count, summary)
+        elif icmplib is not None:
+            rtts = self._icmplib_rtts(host, count, summary)
+        else:
+            rtts = self._ping_rtts(host, count, summary)
         
         try:
-            cmd = f"ping {ping_param} {count} {host}"
-            output = subprocess.check_output(cmd, shell=True, text=True, timeout=count+30)
+            stats = self._latency_statistics(rtts, large=count >= _NUMPY_MIN_SAMPLES)
             
-            # Parse the ping output
-            lines = output.strip().split('\n')
-            times = []
-            packet_loss = "100%"
-            
-            for line in lines:
-                if "time=" in line:
-                    try:
-                        # Extract ping time (works for both Linux and macOS)
-                        time_str = line.split("time=")[1].split()[0].strip()
-                        # Remove 'ms' if present and convert to float
-                        times.append(float(time_str.replace("ms", "")))
-                    except (IndexError, ValueError):
-                        pass
-                elif "packet loss" in line:
-                    try:
-                        for part in line.split(","):
-                            if "packet loss" in part:
-                                packet_loss = part.strip().split()[0]
-                                break
-                    except Exception:
-                        pass
-            
-            if times:
-                # Calculate jitter (average deviation between consecutive pings)
-                jitter = 0
-                if len(times) > 1:
-                    diffs = [abs(times[i] - times[i-1]) for i in range(1, len(times))]
-                    jitter = sum(diffs) / len(diffs)
-                
+            if stats["samples"]:
                 return {
-                    "min": min(times),
-                    "max": max(times),
-                    "avg": statistics.mean(times),
-                    "mdev": statistics.stdev(times) if len(times) > 1 else 0,
-                    "jitter": jitter,
-                    "packet_loss": packet_loss,
-                    "samples": len(times)
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "avg": stats["avg"],
+                    "mdev": stats["mdev"],
+                    "jitter": stats["jitter"],
+                    "packet_loss": summary["packet_loss"],
+                    "samples": stats["samples"],
+                    "method": summary.get("method")
                 }
             else:
                 return {
@@ -259,8 +507,9 @@ class NetworkPerformanceTester:
                     "avg": None,
                     "mdev": None,
                     "jitter": None,
-                    "packet_loss": packet_loss,
-                    "samples": 0
+                    "packet_loss": summary["packet_loss"],
+                    "samples": 0,
+                    "method": summary.get("method")
                 }
         except Exception as e:
             print(f"Error during ping test to {host}: {e}")
@@ -275,39 +524,156 @@ class NetworkPerformanceTester:
                 "error": str(e)
             }
     
-    def run_iperf3_test(self, server, port=5201, duration=10, protocol="tcp", reverse=False):
-        """Run an iperf3 test to measure throughput"""
+    @staticmethod
+    def _latency_statistics(rtts, large=False):
+        """Compute min/max/avg/mdev/jitter over an iterable of RTTs in ms
+        
+        Jitter is the mean deviation between consecutive pings. Large runs
+        are reduced with numpy when it is installed; otherwise statistics
+        are updated in a single pass as each reply arrives.
+        """
+        np = _load_numpy() if large else None
+        if np is not None:
+            times = np.fromiter(rtts, dtype=np.float64)
+            if not times.size:
+                return {"samples": 0}
+            return {
+                "min": float(times.min()),
+                "max": float(times.max()),
+                "avg": float(times.mean()),
+                "mdev": float(times.std(ddof=1)) if times.size > 1 else 0,
+                "jitter": float(np.abs(np.diff(times)).mean()) if times.size > 1 else 0.0,
+                "samples": int(times.size)
+            }
+        
+        latency = RunningStats()
+        deviations = RunningStats()
+        prev_rtt = None
+        
+        for rtt in rtts:
+            latency.update(rtt)
+            if prev_rtt is not None:
+                deviations.update(abs(rtt - prev_rtt))
+            prev_rtt = rtt
+        
+        return {
+            "min": latency.min,
+            "max": latency.max,
+            "avg": latency.mean,
+            "mdev": latency.stdev,
+            "jitter": deviations.mean,
+            "samples": latency.count
+        }
+    
+    def _ping_rtts(self, host, count, summary):
+        """Yield round-trip times in ms from the system ping command as they arrive"""
+        ping_param = "-c" if platform.system() != "Windows" else "-n"
+        
+        cmd = ["ping", ping_param, str(count), host]
+        summary["method"] = "ping"
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        
+        # Kill ping if it hangs; replies read up to that point are kept
+        timer = threading.Timer(count + 30, proc.kill)
+        timer.start()
+        
+        try:
+            samples = 0
+            loss_reported = False
+            for line in proc.stdout:
+                # Reply lines look like "... time=12.3 ms" on Linux and macOS
+                match = _PING_TIME_RE.search(line)
+                if match:
+                    try:
+                        rtt = float(match.group(1))
+                    except ValueError:
+                        continue
+                    samples += 1
+                    yield rtt
+                else:
+                    match = _PING_LOSS_RE.search(line)
+                    if match:
+                        summary["packet_loss"] = match.group(1).decode()
+                        loss_reported = True
+            proc.wait()
+            
+            if not samples and proc.returncode:
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+            
+            # A ping killed by the timer never prints its summary line, so
+            # derive the loss from the replies that did arrive
+            if not loss_reported:
+                summary["packet_loss"] = f"{100 * (count - samples) / count:g}%"
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+    
+    def _fping_rtts(self, host, count, summary):
+        """Yield round-trip times in ms from a single quiet fping run"""
+        # With -C and -q fping prints one line to stderr: "host : t1 t2 - t4 ..."
+        # where '-' marks a lost reply
+        cmd = ["fping", "-C", str(count), "-q", "-p", str(_PING_INTERVAL_MS), "-t", str(_PING_INTERVAL_MS), host]
+        summary["method"] = "fping"
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=count * _PING_INTERVAL_MS / 1000 + 30)
+        
+        for line in proc.stderr.splitlines():
+            name, sep, values = line.partition(" : ")
+            if sep and name.strip() == host:
+                values = values.split()
+                lost = values.count("-")
+                if values:
+                    summary["packet_loss"] = f"{100 * lost / len(values):g}%"
+                for value in values:
+                    if value != "-":
+                        yield float(value)
+                return
+        
+        # No result line, e.g. fping could not open an ICMP socket without
+        # root; use ping instead
+        yield from self._ping_rtts(host, count, summary)
+    
+    def _icmplib_rtts(self, host, count, summary):
+        """Yield round-trip times in ms measured in-process with icmplib"""
+        try:
+            result = icmplib.ping(host, count=count, interval=_PING_INTERVAL_MS / 1000,
+                                  timeout=_PING_INTERVAL_MS / 1000, privileged=False)
+        except icmplib.SocketPermissionError:
+            # Unprivileged ICMP sockets are not permitted here; use ping instead
+            yield from self._ping_rtts(host, count, summary)
+            return
+        
+        summary["method"] = "icmplib"
+        summary["packet_loss"] = f"{result.packet_loss * 100:g}%"
+        yield from result.rtts
+    
+    def run_iperf3_test(self, server, port=5201, duration=10, protocol="tcp", reverse=False,
+                        streams=1, window=None):
+        """Run an iperf3 test to measure throughput over one or more parallel streams"""
         if not self.has_iperf3:
             return {"error": "iperf3 not installed"}
         
         print(f"Running iperf3 {protocol.upper()} {'download' if reverse else 'upload'} test to {server}:{port} for {duration}s...")
         
-        cmd = f"iperf3 -c {server} -p {port} -t {duration} -J"
+        cmd = ["iperf3", "-c", server, "-p", str(port), "-t", str(duration), "-J"]
         if protocol.lower() == "udp":
-            cmd += " -u"
+            cmd.append("-u")
         if reverse:
-            cmd += " -R"
+            cmd.append("-R")
+        if streams > 1:
+            cmd.extend(["-P", str(streams)])
+        if window:
+            cmd.extend(["-w", window])
         
         try:
-            output = subprocess.check_output(cmd, shell=True, text=True, timeout=duration+15)
+            output = subprocess.run(cmd, capture_output=True, timeout=duration+15, check=True).stdout
             try:
-                result = json.loads(output)
+                result = _json_loads(output)
                 if protocol.lower() == "tcp":
-                    sent = result.get("end", {}).get("sum_sent", {})
-                    received = result.get("end", {}).get("sum_received", {})
-                    
-                    # Get the appropriate result based on direction
-                    data = received if reverse else sent
-                    
-                    return {
-                        "protocol": "TCP",
-                        "bits_per_second": data.get("bits_per_second"),
-                        "retransmits": result.get("end", {}).get("sum", {}).get("retransmits", 0),
-                        "sender": not reverse,
-                        "mbps": data.get("bits_per_second", 0) / 1000000
-                    }
+                    return self._summarize_iperf3_tcp(result.get("end", _EMPTY), reverse, streams)
                 else:  # UDP
-                    summary = result.get("end", {}).get("sum", {})
+                    summary = result.get("end", _EMPTY).get("sum", _EMPTY)
                     return {
                         "protocol": "UDP",
                         "bits_per_second": summary.get("bits_per_second"),
@@ -316,22 +682,21 @@ class NetworkPerformanceTester:
                         "packets": summary.get("packets"),
                         "lost_percent": summary.get("lost_percent", 0),
                         "sender": not reverse,
+                        "streams": streams,
                         "mbps": summary.get("bits_per_second", 0) / 1000000
                     }
             except json.JSONDecodeError:
                 print("Error parsing iperf3 JSON output")
                 # If JSON parse fails, try to extract basic information
+                output = output.decode(errors="replace")
                 mbps = None
-                for line in output.split('\n'):
-                    if "sender" in line and "Mbits/sec" in line:
-                        parts = line.split()
-                        for i, part in enumerate(parts):
-                            if "Mbits/sec" in part and i > 0:
-                                try:
-                                    mbps = float(parts[i-1])
-                                    break
-                                except (ValueError, IndexError):
-                                    pass
+                # The last sender line is the summary for the whole test
+                matches = _IPERF_SENDER_RE.findall(output)
+                if matches:
+                    try:
+                        mbps = float(matches[-1])
+                    except ValueError:
+                        pass
                 
                 return {
                     "protocol": protocol.upper(),
@@ -341,7 +706,7 @@ class NetworkPerformanceTester:
                 }
         except subprocess.CalledProcessError as e:
             print(f"iperf3 error: {e}")
-            return {"error": f"iperf3 failed with return code {e.returncode}", "output": e.output if hasattr(e, 'output') else None}
+            return {"error": f"iperf3 failed with return code {e.returncode}", "output": e.output.decode(errors="replace") if e.output else None}
         except subprocess.TimeoutExpired:
             print("iperf3 test timed out")
             return {"error": "Timeout expired"}
@@ -349,6 +714,87 @@ class NetworkPerformanceTester:
             print(f"Error during iperf3 test: {e}")
             return {"error": str(e)}
     
+    def run_iperf3_bidir_test(self, server, port=5201, duration=10, streams=1, window=None):
+        """Run TCP upload and download in one bidirectional iperf3 session
+        
+        Returns an (upload, download) pair of results. Falls back to two
+        separate runs on iperf3 versions without --bidir (before 3.7).
+        """
+        if not self.has_iperf3:
+            error = {"error": "iperf3 not installed"}
+            return error, error
+        
+        print(f"Running iperf3 TCP bidirectional test to {server}:{port} for {duration}s...")
+        
+        cmd = ["iperf3", "-c", server, "-p", str(port), "-t", str(duration), "-J", "--bidir"]
+        if streams > 1:
+            cmd.extend(["-P", str(streams)])
+        if window:
+            cmd.extend(["-w", window])
+        
+        try:
+            output = subprocess.run(cmd, capture_output=True, timeout=duration+15, check=True).stdout
+            end = _json_loads(output).get("end", _EMPTY)
+            return (
+                self._summarize_iperf3_tcp(end, False, streams, bidir=True),
+                self._summarize_iperf3_tcp(end, True, streams, bidir=True)
+            )
+        except subprocess.CalledProcessError as e:
+            if b"bidir" in (e.stdout or b"") + (e.stderr or b""):
+                print("iperf3 does not support --bidir, running upload and download separately")
+                return (
+                    self.run_iperf3_test(server, port, duration, "tcp", False, streams, window),
+                    self.run_iperf3_test(server, port, duration, "tcp", True, streams, window)
+                )
+            print(f"iperf3 error: {e}")
+            error = {"error": f"iperf3 failed with return code {e.returncode}", "output": e.output.decode(errors="replace") if e.output else None}
+        except json.JSONDecodeError:
+            print("Error parsing iperf3 JSON output")
+            error = {"error": "Could not parse JSON output"}
+        except subprocess.TimeoutExpired:
+            print("iperf3 test timed out")
+            error = {"error": "Timeout expired"}
+        except Exception as e:
+            print(f"Error during iperf3 test: {e}")
+            error = {"error": str(e)}
+        return error, error
+    
+    @staticmethod
+    def _summarize_iperf3_tcp(end, reverse, streams, bidir=False):
+        """Build the TCP result for one direction from the 'end' section of iperf3 JSON"""
+        # In --bidir mode the client-receiving direction has its own totals
+        suffix = "_bidir_reverse" if bidir and reverse else ""
+        sent = end.get("sum_sent" + suffix, _EMPTY)
+        received = end.get("sum_received" + suffix, _EMPTY)
+        
+        # Get the appropriate result based on direction
+        side = "receiver" if reverse else "sender"
+        data = received if reverse else sent
+        
+        # Total throughput is the sum over the parallel streams flowing in
+        # this direction (iperf3 flags whether this host sent each stream)
+        bits_per_second = data.get("bits_per_second")
+        stream_results = [
+            stream for stream in end.get("streams", [])
+            if stream.get("sender", _EMPTY).get("sender", not reverse) == (not reverse)
+        ]
+        if stream_results:
+            bits_per_second = sum(
+                stream.get(side, _EMPTY).get("bits_per_second", 0) for stream in stream_results
+            )
+        
+        return {
+            "protocol": "TCP",
+            "bits_per_second": bits_per_second,
+            "bytes": data.get("bytes"),
+            "seconds": received.get("seconds"),
+            "retransmits": sent.get("retransmits", 0),
+            "sender": not reverse,
+            "streams": streams,
+            "mode": "bidir" if bidir else "sequential",
+            "mbps": (bits_per_second or 0) / 1000000
+        }
+    
     def run_speedtest(self):
         """Run internet speed test using speedtest-cli"""
         if not self.has_speedtest:
@@ -357,60 +803,46 @@ class NetworkPerformanceTester:
         print("Running internet speed test (this may take a minute)...")
         
         try:
-            # First try with speedtest-cli
-            try:
-                output = subprocess.check_output("speedtest-cli --json", shell=True, text=True, timeout=120)
-            except (subprocess.SubprocessError, FileNotFoundError):
-                # Fall back to 'speedtest' command if available
-                output = subprocess.check_output("speedtest --format=json", shell=True, text=True, timeout=120)
+            output = subprocess.run(self.speedtest_cmd, capture_output=True, timeout=120, check=True).stdout
             
             try:
-                result = json.loads(output)
+                result = _json_loads(output)
                 
                 # Handle different JSON formats between speedtest and speedtest-cli
                 if "download" in result and isinstance(result["download"], dict):
                     # New speedtest format
+                    server = result.get("server") or _EMPTY
                     return {
                         "download_mbps": result["download"]["bandwidth"] * 8 / 1000000,
                         "upload_mbps": result["upload"]["bandwidth"] * 8 / 1000000,
                         "ping_ms": result["ping"]["latency"],
                         "jitter_ms": result["ping"].get("jitter", None),
-                        "server": result.get("server", {}).get("name", "Unknown"),
-                        "server_country": result.get("server", {}).get("country", "Unknown")
+                        "server": server.get("name", "Unknown"),
+                        "server_country": server.get("country", "Unknown")
                     }
                 else:
                     # Old speedtest-cli format
+                    server = result.get("server") or _EMPTY
                     return {
                         "download_mbps": result["download"] / 1000000,  # Convert to Mbps
                         "upload_mbps": result["upload"] / 1000000,      # Convert to Mbps
                         "ping_ms": result["ping"],
-                        "server": result.get("server", {}).get("sponsor", "Unknown"),
-                        "server_country": result.get("server", {}).get("country", "Unknown")
+                        "server": server.get("sponsor", "Unknown"),
+                        "server_country": server.get("country", "Unknown")
                     }
             except json.JSONDecodeError:
                 # If JSON parse fails, try to extract basic information
-                download = upload = ping = None
-                for line in output.split('\n'):
-                    if "Download:" in line:
-                        try:
-                            download = float(line.split(':')[1].strip().split(' ')[0])
-                        except (ValueError, IndexError):
-                            pass
-                    elif "Upload:" in line:
-                        try:
-                            upload = float(line.split(':')[1].strip().split(' ')[0])
-                        except (ValueError, IndexError):
-                            pass
-                    elif "Ping:" in line:
-                        try:
-                            ping = float(line.split(':')[1].strip().split(' ')[0])
-                        except (ValueError, IndexError):
-                            pass
+                values = {}
+                for name, value in _SPEEDTEST_TEXT_RE.findall(output.decode(errors="replace")):
+                    try:
+                        values[name] = float(value)
+                    except ValueError:
+                        pass
                 
                 return {
-                    "download_mbps": download,
-                    "upload_mbps": upload,
-                    "ping_ms": ping,
+                    "download_mbps": values.get("Download"),
+                    "upload_mbps": values.get("Upload"),
+                    "ping_ms": values.get("Ping"),
                     "parse_error": "Could not parse JSON output"
                 }
                 
@@ -426,6 +858,17 @@ class NetworkPerformanceTester:
     
     def get_local_network_ip(self):
         """Get an IP address on the local network"""
+        # Connecting a UDP socket only selects a route; no packets are sent
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+        except OSError:
+            pass
+        finally:
+            s.close()
+        
+        # Fall back to the detected interface addresses
         local_ips = []
         for iface, data in self.system_info["interfaces"].items():
             ip = data.get("ip")
@@ -445,62 +888,70 @@ class NetworkPerformanceTester:
         if not local_ip:
             return {"error": "Could not find local network IP"}
         
+        # iperf3 measures the network stack alone, without creating a test file
+        if self.has_iperf3:
+            return self._run_local_iperf3_test(local_ip)
+        
         print(f"Running local network file transfer test (creating {size_mb}MB test file)...")
         
         # Create a temporary file with random data
         temp_filename = f"net_test_{int(time.time())}_{random.randint(1000, 9999)}.bin"
         try:
-            if platform.system() == "Linux":
-                subprocess.check_call(
-                    f"dd if=/dev/urandom of={temp_filename} bs=1M count={size_mb}", 
-                    shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-            else:  # macOS
-                with open(temp_filename, 'wb') as f:
-                    f.write(os.urandom(size_mb * 1024 * 1024))
+            # Written in 1 MiB chunks so memory use stays flat regardless of size
+            with open(temp_filename, 'wb') as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
             
-            # Start a simple HTTP server in a separate process
-            server_cmd = f"python3 -m http.server 8765"
-            server_process = subprocess.Popen(
-                server_cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            # Serve the file from a background thread; binding port 0 lets
+            # the OS pick a free port and the listener is ready immediately
+            listener = socket.create_server((local_ip, 0))
+            listener.settimeout(_TRANSFER_TIMEOUT_S)
+            port = listener.getsockname()[1]
+            server_thread = threading.Thread(
+                target=self._serve_file_once, args=(listener, temp_filename), daemon=True
             )
+            server_thread.start()
             
             try:
-                # Give the server time to start
-                time.sleep(2)
-                
-                # Download the file using curl and measure the time
-                start_time = time.time()
-                download_result = subprocess.check_output(
-                    f"curl -s -o /dev/null -w '%{speed_download}' http://{local_ip}:8765/{temp_filename}",
-                    shell=True, text=True, timeout=300
-                )
-                end_time = time.time()
+                # Receive the file into a reusable buffer and time it with
+                # the monotonic clock
+                buffer = memoryview(bytearray(1024 * 1024))
+                bytes_received = 0
+                start_time = time.perf_counter_ns()
+                with socket.create_connection((local_ip, port), timeout=_TRANSFER_TIMEOUT_S) as sock:
+                    # MSG_WAITALL lets each recv fill the whole buffer, so a
+                    # 1 MiB chunk costs one syscall instead of one per segment.
+                    # It only takes effect on a blocking socket, so the stall
+                    # timeout is set at the socket level with SO_RCVTIMEO
+                    sock.settimeout(None)
+                    if sys.platform == "win32":
+                        rcvtimeo = struct.pack("I", _TRANSFER_TIMEOUT_S * 1000)
+                    else:
+                        rcvtimeo = struct.pack("ll", _TRANSFER_TIMEOUT_S, 0)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, rcvtimeo)
+                    while True:
+                        received = sock.recv_into(buffer, 0, socket.MSG_WAITALL)
+                        if not received:
+                            break
+                        bytes_received += received
+                elapsed_ns = time.perf_counter_ns() - start_time
                 
-                elapsed_time = end_time - start_time
-                transfer_speed_mbps = (size_mb * 8) / elapsed_time
-                
-                try:
-                    # Try to parse curl's speed output if available
-                    curl_speed = float(download_result.strip())
-                    transfer_speed_mbps_curl = curl_speed * 8 / 1000000  # Convert bytes/s to Mbps
-                except (ValueError, TypeError):
-                    transfer_speed_mbps_curl = None
+                # The sender closes early if it fails, so a short transfer is an error
+                expected_bytes = size_mb * 1024 * 1024
+                if bytes_received < expected_bytes:
+                    return {"error": f"Incomplete transfer: received {bytes_received} of {expected_bytes} bytes"}
                 
                 return {
+                    "method": "socket",
                     "file_size_mb": size_mb,
-                    "elapsed_seconds": elapsed_time,
-                    "transfer_speed_mbps": transfer_speed_mbps,
-                    "transfer_speed_mbps_curl": transfer_speed_mbps_curl
+                    "bytes_received": bytes_received,
+                    "elapsed_seconds": elapsed_ns / 1e9,
+                    "transfer_speed_mbps": bytes_received * 8 / elapsed_ns * 1000
                 }
                 
             finally:
-                # Make sure to terminate the server
-                server_process.terminate()
-                try:
-                    server_process.wait(timeout=5)
-                except subprocess.TimeoutExpired:
-                    server_process.kill()
+                listener.close()
+                server_thread.join(timeout=5)
         
         except Exception as e:
             print(f"Error during local transfer test: {e}")
@@ -514,16 +965,189 @@ class NetworkPerformanceTester:
             except Exception:
                 pass
     
+    def _run_local_iperf3_test(self, local_ip, duration=5):
+        """Measure local throughput with a one-shot iperf3 server on this host"""
+        print(f"Running local network transfer test with iperf3 for {duration}s...")
+        
+        # Let the OS pick a free port for the server
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind((local_ip, 0))
+            port = probe.getsockname()[1]
+        
+        # No -1 here: a one-off server exits on the readiness probe's empty
+        # connection, so the server is stopped after the client run instead
+        server_process = subprocess.Popen(
+            ["iperf3", "-s", "-B", local_ip, "-p", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        
+        try:
+            # A refused connection fails fast, so probe until the server is
+            # listening and then run the client once
+            deadline = time.perf_counter() + 5
+            while True:
+                try:
+                    socket.create_connection((local_ip, port), timeout=1).close()
+                    break
+                except OSError:
+                    if server_process.poll() is not None or time.perf_counter() > deadline:
+                        return {"error": "Local iperf3 server did not start"}
+                    time.sleep(0.1)
+            
+            result = self.run_iperf3_test(local_ip, port=port, duration=duration)
+        finally:
+            if server_process.poll() is None:
+                server_process.terminate()
+                try:
+                    server_process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    server_process.kill()
+        
+        if "error" in result or result.get("mbps") is None:
+            return {"error": result.get("error", "Could not parse iperf3 output")}
+        
+        return {
+            "method": "iperf3",
+            "bytes_received": result.get("bytes"),
+            "elapsed_seconds": result.get("seconds"),
+            "transfer_speed_mbps": result["mbps"]
+        }
+    
+    @staticmethod
+    def _serve_file_once(listener, filename):
+        """Accept one connection on listener and send it the file with sendfile(2)"""
+        try:
+            conn, _ = listener.accept()
+            with conn, open(filename, 'rb') as f:
+                conn.sendfile(f)
+        except OSError:
+            # The client detects the short transfer or connection error
+            pass
+    
+    def _run_iperf3_tests(self):
+        """Run the iperf3 TCP upload, download and UDP tests back to back"""
+        # Upload and download normally run one after the other. --bidir runs
+        # them together, which is quicker but makes each direction read lower
+        # on half-duplex links such as Wi-Fi.
+        if self.bidir:
+            tcp_upload, tcp_download = self.run_iperf3_bidir_test(
+                self.iperf_server_ip, duration=self.duration, streams=self.streams, window=self.window
+            )
+        else:
+            tcp_upload = self.run_iperf3_test(
+                self.iperf_server_ip, duration=self.duration, protocol="tcp", reverse=False,
+                streams=self.streams, window=self.window
+            )
+            tcp_download = self.run_iperf3_test(
+                self.iperf_server_ip, duration=self.duration, protocol="tcp", reverse=True,
+                streams=self.streams, window=self.window
+            )
+        return {
+            "iperf_tcp_upload": tcp_upload,
+            "iperf_tcp_download": tcp_download,
+            "iperf_udp_test": self.run_iperf3_test(
+                self.iperf_server_ip, protocol="udp", duration=self.duration,
+                streams=self.streams, window=self.window
+            )
+        }
+    
+    def _run_iteration_task(self, task):
+        """Run one (name, callable) test task and return its results dict"""
+        name, func = task
+        try:
+            return func()
+        except Exception as e:
+            print(f"Error during {name} test: {e}")
+            return {}
+    
+    def _print_iteration_results(self, iteration_results):
+        """Print the results of a single test iteration"""
+        # A task that raised leaves its results missing
+        missing = {"error": "Test did not complete"}
+        
+        latency_result = iteration_results.get("latency_test", missing)
+        if latency_result.get("avg") is not None:
+            print(f"Latency test results (8.8.8.8, {latency_result.get('method') or 'ping'}):")
+            print(f"  Min/Avg/Max/StdDev = {latency_result['min']:.2f}/{latency_result['avg']:.2f}/{latency_result['max']:.2f}/{latency_result['mdev']:.2f} ms")
+            print(f"  Jitter = {latency_result['jitter']:.2f} ms")
+            print(f"  Packet Loss = {latency_result['packet_loss']}")
+        else:
+            print(f"Latency test failed: {latency_result.get('error', 'Unknown error')}")
+        
+        # iperf3 tests (if server specified)
+        if self.iperf_server:
+            tcp_upload = iteration_results.get("iperf_tcp_upload", missing)
+            if "error" not in tcp_upload:
+                print(f"iperf3 TCP upload test results:")
+                print(f"  Throughput: {tcp_upload['mbps']:.2f} Mbps")
+                if "retransmits" in tcp_upload:
+                    print(f"  Retransmits: {tcp_upload['retransmits']}")
+            else:
+                print(f"iperf3 TCP upload test failed: {tcp_upload.get('error', 'Unknown error')}")
+            
+            tcp_download = iteration_results.get("iperf_tcp_download", missing)
+            if "error" not in tcp_download:
+                print(f"iperf3 TCP download test results:")
+                print(f"  Throughput: {tcp_download['mbps']:.2f} Mbps")
+                if "retransmits" in tcp_download:
+                    print(f"  Retransmits: {tcp_download['retransmits']}")
+            else:
+                print(f"iperf3 TCP download test failed: {tcp_download.get('error', 'Unknown error')}")
+            
+            udp_test = iteration_results.get("iperf_udp_test", missing)
+            if "error" not in udp_test:
+                print(f"iperf3 UDP test results:")
+                print(f"  Throughput: {udp_test['mbps']:.2f} Mbps")
+                if "jitter_ms" in udp_test:
+                    print(f"  Jitter: {udp_test['jitter_ms']:.2f} ms")
+                if "lost_percent" in udp_test:
+                    print(f"  Packet Loss: {udp_test['lost_percent']:.2f}%")
+            else:
+                print(f"iperf3 UDP test failed: {udp_test.get('error', 'Unknown error')}")
+        
+        # Internet speed test
+        if self.should_run_speedtest:
+            speed_test = iteration_results.get("speedtest", missing)
+            if "error" not in speed_test:
+                print(f"Internet speed test results:")
+                print(f"  Download: {speed_test['download_mbps']:.2f} Mbps")
+                print(f"  Upload: {speed_test['upload_mbps']:.2f} Mbps")
+                print(f"  Ping: {speed_test['ping_ms']:.2f} ms")
+                if "jitter_ms" in speed_test and speed_test["jitter_ms"] is not None:
+                    print(f"  Jitter: {speed_test['jitter_ms']:.2f} ms")
+                if "server" in speed_test:
+                    print(f"  Server: {speed_test['server']} ({speed_test.get('server_country', 'Unknown')})")
+            else:
+                print(f"Internet speed test failed: {speed_test.get('error', 'Unknown error')}")
+        
+        # Local network transfer test (optional)
+        if self.run_local_test:
+            local_test = iteration_results.get("local_transfer", missing)
+            if "error" not in local_test:
+                print(f"Local network transfer test results ({local_test.get('method', 'socket')}):")
+                if "file_size_mb" in local_test:
+                    print(f"  File size: {local_test['file_size_mb']} MB")
+                if local_test.get("elapsed_seconds") is not None:
+                    print(f"  Transfer time: {local_test['elapsed_seconds']:.2f} seconds")
+                print(f"  Transfer speed: {local_test['transfer_speed_mbps']:.2f} Mbps")
+            else:
+                print(f"Local network transfer test failed: {local_test.get('error', 'Unknown error')}")
+    
     def run_tests(self):
         """Run all network performance tests"""
         print(f"\n{'=' * 60}")
         print(f"Network Performance Test Suite - {self.system_info['timestamp']}")
         print(f"System: {self.system_info['os']} {self.system_info['os_version']}")
         print(f"Hostname: {self.system_info['hostname']}")
+        if self.iperf_server:
+            if self.iperf_server_ip != self.iperf_server:
+                print(f"iPerf3 server: {self.iperf_server} ({self.iperf_server_ip})")
+            else:
+                print(f"iPerf3 server: {self.iperf_server}")
         print("Network Interfaces:")
         for iface, data in self.system_info['interfaces'].items():
             ip = data.get("ip")
-            details = data.get("details", {})
+            details = data.get("details", _EMPTY)
             iface_type = details.get("type", "unknown")
             speed = details.get("speed", "Unknown")
             
@@ -536,6 +1160,17 @@ class NetworkPerformanceTester:
         
         print(f"{'=' * 60}\n")
         
+        self._open_csv()
+        try:
+            self._run_iterations()
+        finally:
+            self._close_csv()
+        
+        self._save_results()
+        self._print_summary()
+    
+    def _run_iterations(self):
+        """Run the configured number of test iterations"""
         for i in range(self.iterations):
             print(f"\nIteration {i+1} of {self.iterations}")
             print(f"{'-' * 40}")
@@ -545,97 +1180,33 @@ class NetworkPerformanceTester:
                 "iteration": i + 1
             }
             
-            # Latency and jitter test (Google DNS)
-            latency_result = self.run_latency_jitter_test(host="8.8.8.8", count=100)
-            iteration_results["latency_test"] = latency_result
-            
-            if latency_result["avg"] is not None:
-                print(f"Latency test results (8.8.8.8):")
-                print(f"  Min/Avg/Max/StdDev = {latency_result['min']:.2f}/{latency_result['avg']:.2f}/{latency_result['max']:.2f}/{latency_result['mdev']:.2f} ms")
-                print(f"  Jitter = {latency_result['jitter']:.2f} ms")
-                print(f"  Packet Loss = {latency_result['packet_loss']}")
-            else:
-                print(f"Latency test failed: {latency_result.get('error', 'Unknown error')}")
-            
-            # iperf3 tests (if server specified)
+            tasks = [("latency", lambda: {"latency_test": self.run_latency_jitter_test(host="8.8.8.8", count=self.ping_count)})]
             if self.iperf_server:
-                # TCP upload test
-                tcp_upload = self.run_iperf3_test(self.iperf_server, protocol="tcp", duration=self.duration)
-                iteration_results["iperf_tcp_upload"] = tcp_upload
-                
-                if "error" not in tcp_upload:
-                    print(f"iperf3 TCP upload test results:")
-                    print(f"  Throughput: {tcp_upload['mbps']:.2f} Mbps")
-                    if "retransmits" in tcp_upload:
-                        print(f"  Retransmits: {tcp_upload['retransmits']}")
-                else:
-                    print(f"iperf3 TCP upload test failed: {tcp_upload.get('error', 'Unknown error')}")
-                
-                # TCP download test
-                tcp_download = self.run_iperf3_test(self.iperf_server, protocol="tcp", duration=self.duration, reverse=True)
-                iteration_results["iperf_tcp_download"] = tcp_download
-                
-                if "error" not in tcp_download:
-                    print(f"iperf3 TCP download test results:")
-                    print(f"  Throughput: {tcp_download['mbps']:.2f} Mbps")
-                    if "retransmits" in tcp_download:
-                        print(f"  Retransmits: {tcp_download['retransmits']}")
-                else:
-                    print(f"iperf3 TCP download test failed: {tcp_download.get('error', 'Unknown error')}")
-                
-                # UDP test
-                udp_test = self.run_iperf3_test(self.iperf_server, protocol="udp", duration=self.duration)
-                iteration_results["iperf_udp_test"] = udp_test
-                
-                if "error" not in udp_test:
-                    print(f"iperf3 UDP test results:")
-                    print(f"  Throughput: {udp_test['mbps']:.2f} Mbps")
-                    if "jitter_ms" in udp_test:
-                        print(f"  Jitter: {udp_test['jitter_ms']:.2f} ms")
-                    if "lost_percent" in udp_test:
-                        print(f"  Packet Loss: {udp_test['lost_percent']:.2f}%")
-                else:
-                    print(f"iperf3 UDP test failed: {udp_test.get('error', 'Unknown error')}")
-            
-            # Internet speed test
+                tasks.append(("iperf3", self._run_iperf3_tests))
             if self.should_run_speedtest:
-                speed_test = self.run_speedtest()
-                iteration_results["speedtest"] = speed_test
-                
-                if "error" not in speed_test:
-                    print(f"Internet speed test results:")
-                    print(f"  Download: {speed_test['download_mbps']:.2f} Mbps")
-                    print(f"  Upload: {speed_test['upload_mbps']:.2f} Mbps")
-                    print(f"  Ping: {speed_test['ping_ms']:.2f} ms")
-                    if "jitter_ms" in speed_test and speed_test["jitter_ms"] is not None:
-                        print(f"  Jitter: {speed_test['jitter_ms']:.2f} ms")
-                    if "server" in speed_test:
-                        print(f"  Server: {speed_test['server']} ({speed_test.get('server_country', 'Unknown')})")
-                else:
-                    print(f"Internet speed test failed: {speed_test.get('error', 'Unknown error')}")
-            
-            # Local network transfer test (optional)
+                tasks.append(("speedtest", lambda: {"speedtest": self.run_speedtest()}))
             if self.run_local_test:
-                local_test = self.run_local_transfer_test(size_mb=100)
-                iteration_results["local_transfer"] = local_test
-                
-                if "error" not in local_test:
-                    print(f"Local network transfer test results:")
-                    print(f"  File size: {local_test['file_size_mb']} MB")
-                    print(f"  Transfer time: {local_test['elapsed_seconds']:.2f} seconds")
-                    print(f"  Transfer speed: {local_test['transfer_speed_mbps']:.2f} Mbps")
-                else:
-                    print(f"Local network transfer test failed: {local_test.get('error', 'Unknown error')}")
+                tasks.append(("local_transfer", lambda: {"local_transfer": self.run_local_transfer_test(size_mb=100)}))
+            
+            # Tests normally run one at a time so each sees an otherwise idle
+            # link. Concurrent mode finishes sooner, but every test then competes
+            # with the others for the uplink and CPU and is measured under load.
+            if self.concurrent:
+                with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                    for task_results in executor.map(self._run_iteration_task, tasks):
+                        iteration_results.update(task_results)
+            else:
+                for task_results in map(self._run_iteration_task, tasks):
+                    iteration_results.update(task_results)
+            
+            self._print_iteration_results(iteration_results)
             
-            self.results.append(iteration_results)
+            self._record_result(iteration_results)
             
             # Sleep between iterations (except the last one)
             if i < self.iterations - 1:
                 print(f"\nWaiting 5 seconds before next test iteration...")
                 time.sleep(5)
-        
-        self._save_results()
-        self._print_summary()
     
     def _save_results(self):
         """Save test results to file if specified"""
@@ -648,223 +1219,258 @@ class NetworkPerformanceTester:
             
             # Save raw data as JSON for detailed analysis
             json_file = self.output_file.replace('.csv', '.json')
-            with open(json_file, 'w') as f:
-                json.dump({
-                    "system_info": self.system_info,
-                    "results": self.results,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }, f, indent=2)
+            # The per-iteration results are already serialized, so they are
+            # spliced into the document rather than dumped again
+            if self._result_blobs:
+                results = b"[\n    " + b",\n    ".join(self._result_blobs) + b"\n  ]"
+            else:
+                results = b"[]"
+            with open(json_file, 'wb') as f:
+                f.write(b'{\n  "system_info": ' + _json_fragment(self.system_info, 1))
+                f.write(b',\n  "results": ' + results)
+                f.write(b',\n  "timestamp": ' + _json_dumps(datetime.now().strftime("%Y-%m-%d %H:%M:%S")) + b"\n}")
             
             print(f"\nRaw results saved to {json_file}")
-            
-            # Create a simplified CSV file with the most important metrics
-            with open(self.output_file, 'w', newline='') as csvfile:
-                # Create header row based on available tests
-                fieldnames = ["timestamp", "iteration"]
-                
-                # Add latency fields
-                fieldnames.extend([
-                    "latency_min_ms", "latency_avg_ms", "latency_max_ms", 
-                    "jitter_ms", "packet_loss"
-                ])
-                
-                # Add iperf3 fields if applicable
-                if self.iperf_server:
-                    fieldnames.extend([
-                        "tcp_upload_mbps", "tcp_download_mbps", 
-                        "tcp_upload_retransmits", "tcp_download_retransmits",
-                        "udp_mbps", "udp_jitter_ms", "udp_loss_percent"
-                    ])
-                
-                # Add speedtest fields if applicable
-                if self.should_run_speedtest:
-                    fieldnames.extend([
-                        "internet_download_mbps", "internet_upload_mbps", "internet_ping_ms", 
-                        "internet_jitter_ms"
-                    ])
-                
-                # Add local transfer test fields if applicable
-                if self.run_local_test:
-                    fieldnames.extend([
-                        "local_transfer_mbps", "local_transfer_time_s"
-                    ])
-                
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                # Write data rows
-                for result in self.results:
-                    row = {
-                        "timestamp": result["timestamp"],
-                        "iteration": result["iteration"]
-                    }
-                    
-                    # Add latency data
-                    latency = result.get("latency_test", {})
-                    row["latency_min_ms"] = latency.get("min")
-                    row["latency_avg_ms"] = latency.get("avg")
-                    row["latency_max_ms"] = latency.get("max")
-                    row["jitter_ms"] = latency.get("jitter")
-                    row["packet_loss"] = latency.get("packet_loss")
-                    
-                    # Add iperf3 data if applicable
-                    if self.iperf_server:
-                        tcp_upload = result.get("iperf_tcp_upload", {})
-                        tcp_download = result.get("iperf_tcp_download", {})
-                        udp_test = result.get("iperf_udp_test", {})
-                        
-                        row["tcp_upload_mbps"] = tcp_upload.get("mbps")
-                        row["tcp_upload_retransmits"] = tcp_upload.get("retransmits")
-                        row["tcp_download_mbps"] = tcp_download.get("mbps")
-                        row["tcp_download_retransmits"] = tcp_download.get("retransmits")
-                        row["udp_mbps"] = udp_test.get("mbps")
-                        row["udp_jitter_ms"] = udp_test.get("jitter_ms")
-                        row["udp_loss_percent"] = udp_test.get("lost_percent")
-                    
-                    # Add speedtest data if applicable
-                    if self.should_run_speedtest:
-                        speed_test = result.get("speedtest", {})
-                        row["internet_download_mbps"] = speed_test.get("download_mbps")
-                        row["internet_upload_mbps"] = speed_test.get("upload_mbps")
-                        row["internet_ping_ms"] = speed_test.get("ping_ms")
-                        row["internet_jitter_ms"] = speed_test.get("jitter_ms")
-                    
-                    # Add local transfer test data if applicable
-                    if self.run_local_test:
-                        local_test = result.get("local_transfer", {})
-                        row["local_transfer_mbps"] = local_test.get("transfer_speed_mbps")
-                        row["local_transfer_time_s"] = local_test.get("elapsed_seconds")
-                    
-                    writer.writerow(row)
-            
-            print(f"CSV summary saved to {self.output_file}")
+            # The CSV rows were already written as each iteration finished
+            if self._csv_saved:
+                print(f"CSV summary saved to {self.output_file}")
         except Exception as e:
             print(f"Error saving results to file: {e}")
     
+    def _open_csv(self):
+        """Create the CSV summary file and write its header row"""
+        if not self.output_file:
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.output_file)), exist_ok=True)
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+            self._csv_fd = os.open(self.output_file, flags, 0o644)
+            self._write_csv_row(self._fieldnames)
+            self._csv_saved = True
+        except Exception as e:
+            print(f"Error creating CSV file: {e}")
+            self._close_csv()
+    
+    def _close_csv(self):
+        """Close the CSV summary file if it is open"""
+        if self._csv_fd is not None:
+            try:
+                os.close(self._csv_fd)
+            except OSError as e:
+                print(f"Error closing CSV file: {e}")
+                self._csv_saved = False
+        self._csv_fd = None
+    
+    def _build_csv_schema(self):
+        """Return the CSV columns as (column, result section, field) tuples"""
+        # A section of None means the field lives on the result itself
+        schema = [
+            ("timestamp", None, "timestamp"),
+            ("iteration", None, "iteration"),
+            ("latency_min_ms", "latency_test", "min"),
+            ("latency_avg_ms", "latency_test", "avg"),
+            ("latency_max_ms", "latency_test", "max"),
+            ("jitter_ms", "latency_test", "jitter"),
+            ("packet_loss", "latency_test", "packet_loss"),
+        ]
+        
+        # Add iperf3 fields if applicable
+        if self.iperf_server:
+            schema.extend([
+                ("tcp_upload_mbps", "iperf_tcp_upload", "mbps"),
+                ("tcp_download_mbps", "iperf_tcp_download", "mbps"),
+                ("tcp_upload_retransmits", "iperf_tcp_upload", "retransmits"),
+                ("tcp_download_retransmits", "iperf_tcp_download", "retransmits"),
+                ("tcp_test_mode", "iperf_tcp_download", "mode"),
+                ("udp_mbps", "iperf_udp_test", "mbps"),
+                ("udp_jitter_ms", "iperf_udp_test", "jitter_ms"),
+                ("udp_loss_percent", "iperf_udp_test", "lost_percent"),
+            ])
+        
+        # Add speedtest fields if applicable
+        if self.should_run_speedtest:
+            schema.extend([
+                ("internet_download_mbps", "speedtest", "download_mbps"),
+                ("internet_upload_mbps", "speedtest", "upload_mbps"),
+                ("internet_ping_ms", "speedtest", "ping_ms"),
+                ("internet_jitter_ms", "speedtest", "jitter_ms"),
+            ])
+        
+        # Add local transfer test fields if applicable
+        if self.run_local_test:
+            schema.extend([
+                ("local_transfer_mbps", "local_transfer", "transfer_speed_mbps"),
+                ("local_transfer_time_s", "local_transfer", "elapsed_seconds"),
+                ("local_transfer_method", "local_transfer", "method"),
+            ])
+        
+        return schema
+    
+    def _build_summary_metrics(self):
+        """Return the metrics _print_summary aggregates, as name -> CSV column"""
+        metrics = {
+            "latency": "latency_avg_ms",
+            "jitter": "jitter_ms",
+        }
+        if self.iperf_server:
+            metrics.update({
+                "tcp_upload": "tcp_upload_mbps",
+                "tcp_download": "tcp_download_mbps",
+                "udp_speed": "udp_mbps",
+                "udp_jitter": "udp_jitter_ms",
+                "udp_loss": "udp_loss_percent",
+            })
+        if self.should_run_speedtest:
+            metrics.update({
+                "download": "internet_download_mbps",
+                "upload": "internet_upload_mbps",
+                "ping": "internet_ping_ms",
+            })
+        if self.run_local_test:
+            metrics["local_transfer"] = "local_transfer_mbps"
+        
+        return metrics
+    
+    def _record_result(self, result):
+        """Store one iteration's results, collect its summary metrics and write its CSV row"""
+        try:
+            self._result_blobs.append(_json_fragment(result, 2))
+        except (TypeError, ValueError) as e:
+            self._result_blobs.append(_json_fragment({"error": f"Could not serialize results: {e}"}, 2))
+        
+        row = [None] * len(self._schema)
+        for section, fields in self._section_columns.items():
+            values = result if section is None else result.get(section) or _EMPTY
+            for index, column, key in fields:
+                value = values.get(key)
+                if column is not None:
+                    column.append(value)
+                row[index] = value
+        
+        # Write the row right away so an interrupted run still leaves a usable CSV
+        if self._csv_fd is not None:
+            try:
+                self._write_csv_row(row)
+            except OSError as e:
+                # Keep testing; the JSON file and summary are still produced
+                print(f"Error writing to CSV file, no further rows will be saved: {e}")
+                self._csv_saved = False
+                self._close_csv()
+    
+    def _write_csv_row(self, row):
+        """Write one CSV row with a single os.write, quoting through csv only if needed"""
+        line = ",".join(["" if value is None else str(value) for value in row])
+        # Numbers and timestamps never need quoting; anything else that adds a
+        # delimiter, quote or line break is left to csv.writer
+        if line.count(",") != len(row) - 1 or '"' in line or "\n" in line or "\r" in line:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(row)
+            line = buffer.getvalue()
+        else:
+            line += "\r\n"
+        # os.write may write only part of the data, so keep going until the
+        # whole row is on disk
+        data = memoryview(line.encode())
+        while data:
+            data = data[os.write(self._csv_fd, data):]
+    
+    @staticmethod
+    def _column_statistics(values):
+        """Compute count/mean/min/max/stdev over a column, ignoring missing values
+        
+        Long columns are reduced with numpy when it is installed, in one
+        compiled pass when numba is available too; otherwise the builtin
+        sum/min/max reductions are used.
+        """
+        np = _load_numpy() if len(values) >= _NUMPY_MIN_SAMPLES else None
+        if np is not None:
+            column = np.fromiter((value for value in values if value is not None), dtype=np.float64)
+            summarize = _load_summary_kernel() if column.size else None
+            if summarize is not None:
+                mean, low, high, stdev = summarize(column)
+                return {"count": int(column.size), "mean": mean, "min": low, "max": high, "stdev": stdev}
+            if column.size:
+                return {
+                    "count": int(column.size),
+                    "mean": float(column.mean()),
+                    "min": float(column.min()),
+                    "max": float(column.max()),
+                    "stdev": float(column.std(ddof=1)) if column.size > 1 else 0
+                }
+            return {"count": 0}
+        
+        present = [value for value in values if value is not None]
+        count = len(present)
+        if not count:
+            return {"count": 0}
+        mean = sum(present) / count
+        return {
+            "count": count,
+            "mean": mean,
+            "min": min(present),
+            "max": max(present),
+            "stdev": math.sqrt(sum((value - mean) ** 2 for value in present) / (count - 1)) if count > 1 else 0
+        }
+    
     def _print_summary(self):
         """Print a summary of the test results"""
         print(f"\n{'=' * 60}")
         print("SUMMARY")
         print(f"{'=' * 60}")
         
-        # Latency and jitter statistics
-        latency_avgs = []
-        jitter_avgs = []
-        
-        for result in self.results:
-            latency = result.get("latency_test", {})
-            if latency.get("avg") is not None:
-                latency_avgs.append(latency["avg"])
-            if latency.get("jitter") is not None:
-                jitter_avgs.append(latency["jitter"])
-        
-        if latency_avgs:
-            print("\nLatency Statistics:")
-            print(f"  Average latency: {statistics.mean(latency_avgs):.2f} ms")
-            print(f"  Min latency: {min(latency_avgs):.2f} ms")
-            print(f"  Max latency: {max(latency_avgs):.2f} ms")
-            if len(latency_avgs) > 1:
-                print(f"  Latency StdDev: {statistics.stdev(latency_avgs):.2f} ms")
-        
-        if jitter_avgs:
-            print("\nJitter Statistics:")
-            print(f"  Average jitter: {statistics.mean(jitter_avgs):.2f} ms")
-            print(f"  Min jitter: {min(jitter_avgs):.2f} ms")
-            print(f"  Max jitter: {max(jitter_avgs):.2f} ms")
-            if len(jitter_avgs) > 1:
-                print(f"  Jitter StdDev: {statistics.stdev(jitter_avgs):.2f} ms")
+        metrics = self._summary_metrics
+        
+        # Each metric is reduced from its own column list. Long columns are
+        # reduced concurrently, since numpy and the numba kernel release the GIL
+        columns = [self._columns[column] for column in metrics.values()]
+        if len(self._result_blobs) >= _NUMPY_MIN_SAMPLES and len(columns) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(columns), os.cpu_count() or 1)) as executor:
+                reduced = list(executor.map(self._column_statistics, columns))
+        else:
+            reduced = [self._column_statistics(values) for values in columns]
+        stats = dict(zip(metrics, reduced))
+        
+        def print_spread(title, stat, label, unit, stdev_label):
+            print(f"\n{title}:")
+            print(f"  Average{label}: {stat['mean']:.2f} {unit}")
+            print(f"  Min{label}: {stat['min']:.2f} {unit}")
+            print(f"  Max{label}: {stat['max']:.2f} {unit}")
+            if stat["count"] > 1:
+                print(f"  {stdev_label}: {stat['stdev']:.2f} {unit}")
+        
+        if stats["latency"]["count"]:
+            print_spread("Latency Statistics", stats["latency"], " latency", "ms", "Latency StdDev")
+        if stats["jitter"]["count"]:
+            print_spread("Jitter Statistics", stats["jitter"], " jitter", "ms", "Jitter StdDev")
         
         # iperf3 statistics
         if self.iperf_server:
-            # TCP upload
-            tcp_upload_speeds = []
-            for result in self.results:
-                tcp_upload = result.get("iperf_tcp_upload", {})
-                if "mbps" in tcp_upload:
-                    tcp_upload_speeds.append(tcp_upload["mbps"])
-            
-            if tcp_upload_speeds:
-                print("\niPerf3 TCP Upload Statistics:")
-                print(f"  Average: {statistics.mean(tcp_upload_speeds):.2f} Mbps")
-                print(f"  Min: {min(tcp_upload_speeds):.2f} Mbps")
-                print(f"  Max: {max(tcp_upload_speeds):.2f} Mbps")
-                if len(tcp_upload_speeds) > 1:
-                    print(f"  StdDev: {statistics.stdev(tcp_upload_speeds):.2f} Mbps")
-            
-            # TCP download
-            tcp_download_speeds = []
-            for result in self.results:
-                tcp_download = result.get("iperf_tcp_download", {})
-                if "mbps" in tcp_download:
-                    tcp_download_speeds.append(tcp_download["mbps"])
-            
-            if tcp_download_speeds:
-                print("\niPerf3 TCP Download Statistics:")
-                print(f"  Average: {statistics.mean(tcp_download_speeds):.2f} Mbps")
-                print(f"  Min: {min(tcp_download_speeds):.2f} Mbps")
-                print(f"  Max: {max(tcp_download_speeds):.2f} Mbps")
-                if len(tcp_download_speeds) > 1:
-                    print(f"  StdDev: {statistics.stdev(tcp_download_speeds):.2f} Mbps")
-            
-            # UDP
-            udp_speeds = []
-            udp_jitters = []
-            udp_losses = []
+            if stats["tcp_upload"]["count"]:
+                print_spread("iPerf3 TCP Upload Statistics", stats["tcp_upload"], "", "Mbps", "StdDev")
+            if stats["tcp_download"]["count"]:
+                print_spread("iPerf3 TCP Download Statistics", stats["tcp_download"], "", "Mbps", "StdDev")
             
-            for result in self.results:
-                udp_test = result.get("iperf_udp_test", {})
-                if "mbps" in udp_test:
-                    udp_speeds.append(udp_test["mbps"])
-                if "jitter_ms" in udp_test:
-                    udp_jitters.append(udp_test["jitter_ms"])
-                if "lost_percent" in udp_test:
-                    udp_losses.append(udp_test["lost_percent"])
-            
-            if udp_speeds:
+            if stats["udp_speed"]["count"]:
                 print("\niPerf3 UDP Statistics:")
-                print(f"  Average throughput: {statistics.mean(udp_speeds):.2f} Mbps")
-                if udp_jitters:
-                    print(f"  Average jitter: {statistics.mean(udp_jitters):.2f} ms")
-                if udp_losses:
-                    print(f"  Average packet loss: {statistics.mean(udp_losses):.2f}%")
+                print(f"  Average throughput: {stats['udp_speed']['mean']:.2f} Mbps")
+                if stats["udp_jitter"]["count"]:
+                    print(f"  Average jitter: {stats['udp_jitter']['mean']:.2f} ms")
+                if stats["udp_loss"]["count"]:
+                    print(f"  Average packet loss: {stats['udp_loss']['mean']:.2f}%")
         
         # Internet speed test statistics
-        if self.should_run_speedtest:
-            download_speeds = []
-            upload_speeds = []
-            pings = []
-            
-            for result in self.results:
-                speed_test = result.get("speedtest", {})
-                if "download_mbps" in speed_test:
-                    download_speeds.append(speed_test["download_mbps"])
-                if "upload_mbps" in speed_test:
-                    upload_speeds.append(speed_test["upload_mbps"])
-                if "ping_ms" in speed_test:
-                    pings.append(speed_test["ping_ms"])
-            
-            if download_speeds:
-                print("\nInternet Speed Test Statistics:")
-                print(f"  Average download: {statistics.mean(download_speeds):.2f} Mbps")
-                print(f"  Average upload: {statistics.mean(upload_speeds):.2f} Mbps")
-                print(f"  Average ping: {statistics.mean(pings):.2f} ms")
+        if self.should_run_speedtest and stats["download"]["count"]:
+            print("\nInternet Speed Test Statistics:")
+            print(f"  Average download: {stats['download']['mean']:.2f} Mbps")
+            if stats["upload"]["count"]:
+                print(f"  Average upload: {stats['upload']['mean']:.2f} Mbps")
+            if stats["ping"]["count"]:
+                print(f"  Average ping: {stats['ping']['mean']:.2f} ms")
         
         # Local transfer test statistics
-        if self.run_local_test:
-            transfer_speeds = []
-            
-            for result in self.results:
-                local_test = result.get("local_transfer", {})
-                if "transfer_speed_mbps" in local_test:
-                    transfer_speeds.append(local_test["transfer_speed_mbps"])
-            
-            if transfer_speeds:
-                print("\nLocal Network Transfer Statistics:")
-                print(f"  Average speed: {statistics.mean(transfer_speeds):.2f} Mbps")
-                print(f"  Min speed: {min(transfer_speeds):.2f} Mbps")
-                print(f"  Max speed: {max(transfer_speeds):.2f} Mbps")
-                if len(transfer_speeds) > 1:
-                    print(f"  StdDev: {statistics.stdev(transfer_speeds):.2f} Mbps")
+        if self.run_local_test and stats["local_transfer"]["count"]:
+            print_spread("Local Network Transfer Statistics", stats["local_transfer"], " speed", "Mbps", "StdDev")
 
 
 if __name__ == "__main__":
@@ -872,11 +1478,22 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", type=str, help="Output CSV file", default="network_perf_results.csv")
     parser.add_argument("-i", "--iterations", type=int, default=3, help="Number of test iterations")
     parser.add_argument("-s", "--server", type=str, help="iPerf3 server address")
+    parser.add_argument("-c", "--count", type=int, default=100,
+                        help="Number of pings per latency test (numpy speeds up the statistics from 1000)")
     parser.add_argument("-t", "--time", type=int, default=10, help="Duration of bandwidth tests in seconds")
+    parser.add_argument("-P", "--parallel", type=int, default=1,
+                        help="Number of parallel iperf3 streams (4-8 helps saturate fast or high-latency links)")
+    parser.add_argument("-w", "--window", type=str, help="iperf3 socket buffer/window size, e.g. 4M")
+    parser.add_argument("--bidir", action="store_true",
+                        help="Run iperf3 TCP upload and download at the same time (faster, but each direction reads lower on half-duplex links such as Wi-Fi)")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Run the tests of each iteration at the same time (faster, but every result is measured under load)")
     parser.add_argument("--no-speedtest", action="store_true", help="Skip internet speed test")
     parser.add_argument("--no-local", action="store_true", help="Skip local network transfer test")
     
     args = parser.parse_args()
+    if args.count < 1:
+        parser.error("--count must be at least 1")
     
     tester = NetworkPerformanceTester(
         output_file=args.output,
@@ -884,7 +1501,12 @@ if __name__ == "__main__":
         iperf_server=args.server,
         speedtest=not args.no_speedtest,
         local_test=not args.no_local,
-        duration=args.time
+        duration=args.time,
+        streams=args.parallel,
+        window=args.window,
+        concurrent=args.concurrent,
+        ping_count=args.count,
+        bidir=args.bidir
     )
     tester.run_tests()
     
\ No newline at end of file